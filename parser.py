@@ -8,6 +8,10 @@ all_pribors_crawler.py
     python all_pribors_crawler.py --rn 91851-24 --headless True --out data.csv
     python all_pribors_crawler.py --rn 85773-22 --date 2025-09-17
     python all_pribors_crawler.py --rn 85773-22 --date-range 2025-09-01:2025-09-17
+
+Почему браузер, а не HTTP-клиент: таблица карточки появляется в DOM только после клика
+по кнопке карточки (рендер на клиенте), в исходном HTML страницы результатов её нет.
+Поэтому страницы обходятся через Selenium; трафик сокращается блокировкой ресурсов (BLOCKED_URL_PATTERNS).
 """
 
 import argparse
@@ -16,9 +20,13 @@ import time
 import re
 import logging
 import os
-import json
-from typing import List, Optional, Dict, Any, Tuple
+import multiprocessing
+from multiprocessing.util import Finalize
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Tuple, Callable
 from datetime import datetime, timedelta
+import orjson
 from selenium.webdriver.chrome.service import Service
 #from webdriver_manager.chrome import ChromeDriverManager 
 from selenium import webdriver
@@ -32,7 +40,8 @@ from selenium.common.exceptions import (
 )
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from utils.filter_dupls import cleanup_incomplete_pages
+from urllib3.exceptions import MaxRetryError
+from utils.filter_dupls import find_incomplete_pages
 
 # --------------------
 # Логгирование
@@ -54,26 +63,239 @@ PAGE_BUTTONS_XPATH = "//*[@class='page-link shadow-none']"
 CARD_BUTTON_XPATH = "//*[@class='btn btn-primary btn-sm dropdown-toggle']"
 OPENED_CARD_XPATH = "//*[@class='border rounded mb-2 p-2 border-warning shadow']"
 TOTAL_COUNT_XPATH = "//*[@class='text-muted text-end']/strong"
+# ссылка пагинации с конкретным номером: PAGE_LINK_XPATH.format(page_num)
+PAGE_LINK_XPATH = PAGE_BUTTONS_XPATH + "[normalize-space()='{}']"
+
+# готовые локаторы для find_element(s)(*LOC) и expected_conditions
+PAGE_BUTTONS_LOC = (By.XPATH, PAGE_BUTTONS_XPATH)
+CARD_BUTTON_LOC = (By.XPATH, CARD_BUTTON_XPATH)
+OPENED_CARD_LOC = (By.XPATH, OPENED_CARD_XPATH)
+TOTAL_COUNT_LOC = (By.XPATH, TOTAL_COUNT_XPATH)
+TABLE_ROWS_LOC = (By.XPATH, ".//tr")
+TH_LOC = (By.TAG_NAME, "th")
+TD_LOC = (By.TAG_NAME, "td")
+
+# JS: прокрутка к кнопке и клик за один вызов execute_script
+CLICK_JS = "arguments[0].scrollIntoView({block:'center', inline:'nearest'}); arguments[0].click();"
+
+# JS (execute_async_script): ждёт через MutationObserver появления новой карточки со строками таблицы.
+# Аргументы: XPath открытых карточек, их число до клика, таймаут в мс.
+WAIT_CARD_JS = """
+const cb = arguments[arguments.length - 1];
+const xp = arguments[0], want = arguments[1] + 1, to = arguments[2];
+const ready = () => {
+  const res = document.evaluate(xp, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  if (res.snapshotLength < want) return false;
+  return res.snapshotItem(res.snapshotLength - 1).querySelector('tr') !== null;
+};
+if (ready()) return cb(true);
+let timer = null;
+const obs = new MutationObserver(() => {
+  if (ready()) { obs.disconnect(); clearTimeout(timer); cb(true); }
+});
+timer = setTimeout(() => { obs.disconnect(); cb(false); }, to);
+obs.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['class']});
+"""
+
+# JS-функция: таблица карточки -> {th: td}
+CARD_TABLE_JS_FN = """
+const cardTable = (card) => {
+  const out = {};
+  for (const r of card.querySelectorAll('tr')) {
+    const th = r.querySelector('th'); const td = r.querySelector('td');
+    if (!th || !td) continue;
+    const key = th.innerText.trim().replace(/\\n/g, '');
+    if (key) out[key] = td.innerText.trim().replace(/\\n/g, '');
+  }
+  return out;
+};
+"""
+
+# JS: собирает таблицу карточки {th: td} за один вызов execute_script
+EXTRACT_CARD_JS = CARD_TABLE_JS_FN + "return cardTable(arguments[0]);"
+
+# JS: таблицы всех открытых карточек страницы [{th: td}, ...], начиная с индекса arguments[1]
+EXTRACT_CARDS_JS = CARD_TABLE_JS_FN + """
+const res = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const out = [];
+for (let i = arguments[1]; i < res.snapshotLength; i++) out.push(cardTable(res.snapshotItem(i)));
+return out;
+"""
+
+# JS (execute_async_script): по очереди открывает карточки страницы и возвращает индекс первой
+# карточки, открытой этим вызовом. Останавливается, если очередная карточка не открылась вовремя.
+# Аргументы: XPath кнопок, XPath открытых карточек, максимум кликов, таймаут на карточку (мс), общий бюджет (мс).
+OPEN_ALL_CARDS_JS = """
+const cb = arguments[arguments.length - 1];
+const [btnXp, cardXp, maxClicks, perCardMs, budgetMs] = arguments;
+const snap = (xp) => document.evaluate(xp, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+(async () => {
+  const start = Date.now();
+  const before = snap(cardXp).snapshotLength;
+  let opened = before;
+  for (let i = 0; i < maxClicks && Date.now() - start < budgetMs; i++) {
+    const btns = snap(btnXp);
+    if (!btns.snapshotLength) break;
+    const btn = btns.snapshotItem(0);
+    btn.scrollIntoView({block: 'center', inline: 'nearest'});
+    btn.click();
+    const t0 = Date.now();
+    let ok = false;
+    while (Date.now() - t0 < perCardMs) {
+      const cards = snap(cardXp);
+      const n = cards.snapshotLength;
+      if (n > opened && cards.snapshotItem(n - 1).querySelector('tr')) { ok = true; opened = n; break; }
+      await sleep(50);
+    }
+    if (!ok) break;
+  }
+  return before;
+})().then(cb, () => cb(null));
+"""
 
 DEFAULT_WAIT = 2
 CLICK_RETRIES = 3
-DELAY_AFTER_CLICK = 2
-DELAY_BETWEEN_PAGES = 2
+PAGE_READY_TIMEOUT = 5  # сколько ждём появления элементов после перехода/клика
+DELAY_BETWEEN_PAGES = 2  # пауза, только если страница после рестарта так и не стала готова
+SCRIPT_TIMEOUT = 60  # таймаут execute_async_script (открытие всех карточек страницы)
+WAIT_POLL = 0.1  # частота опроса в WebDriverWait
 MAX_ATTEMPTS_PER_PAGE = 3  # даём по 3 попытки на страницу
 CARDS_PER_PAGE = 20  # ожидаемое количество карточек на «полной» странице
+CSV_BUFFER_SIZE = 1 << 20  # буфер файла CSV (1 МиБ)
+HTTP_CACHE_SIZE = 512 * 1024 * 1024  # размер дискового кеша Chrome при --cache (байт)
+PROGRESS_LOG_BUFFER_SIZE = 1 << 16  # буфер журнала прогресса (.progress.jsonl)
+PROGRESS_COMPACT_INTERVAL = 60  # раз в сколько секунд сворачивать журнал в .progress.json
+PROGRESS_FLUSH_PAGES = 10  # ... или после стольких обработанных страниц
+MAX_WORKERS = 8  # верхний предел параллельных процессов Chrome (--workers)
+
+# Ресурсы, загрузку которых блокируем через CDP (скрейперу нужен только DOM с текстом)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff*", "*.ttf", "*.mp4", "*.css",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*", "*mc.yandex*",
+]
 
 # Название поля в карточке, которое указывает дату поверки (как в CSV)
 DATE_FIELD_NAME = "Дата поверки"
 
 
+_NON_DIGIT = re.compile(r'\D')
+# таблица для str.translate: удаляет все нецифровые символы из первых 256 кодов
+_KEEP_DIGITS = str.maketrans('', '', ''.join(chr(c) for c in range(256) if chr(c) not in '0123456789'))
+
+
 def safe_int(s):
     """Преобразует строку в int, убирая все нецифровые символы."""
+    s = str(s)
+    try:
+        return int(s.translate(_KEEP_DIGITS))
+    except ValueError:
+        # остались символы за пределами latin-1 (например, узкий неразрывный пробел)
+        pass
     try:
-        return int(re.sub(r'\D', '', str(s)))
+        return int(_NON_DIGIT.sub('', s))
     except Exception:
         return None
 
 
+# Chrome процесса-воркера: живёт между задачами пула, чтобы не запускать браузер на каждую дату
+_pooled_driver = None
+# номер воркера 0..N-1: по нему Chrome воркера получает свой подкаталог дискового кеша
+_worker_slot = 0
+
+
+def _init_pool_worker(slot_counter):
+    """Инициализатор процесса пула: занять номер воркера и закрыть Chrome при штатном завершении."""
+    global _worker_slot
+    with slot_counter.get_lock():
+        _worker_slot = slot_counter.value
+        slot_counter.value += 1
+    # atexit в процессах пула не вызывается, а финализаторы multiprocessing — вызываются
+    Finalize(None, _quit_pooled_driver, exitpriority=10)
+
+
+def _quit_pooled_driver():
+    global _pooled_driver
+    if _pooled_driver is not None:
+        try:
+            _pooled_driver.quit()
+        except Exception:
+            pass
+        _pooled_driver = None
+
+
+def _parse_bool(s: str) -> bool:
+    """Значение флага вида --headless False / --headless true."""
+    return s.lower() in ("1", "true", "yes")
+
+
+def _crawl_date_worker(args: Tuple[str, bool, str, str, Optional[str]]) -> Optional[str]:
+    """Воркер пула: свой процесс, свой (переиспользуемый) Chrome и свой CSV-шард на одну дату."""
+    global _pooled_driver
+    rn, headless, shard_out, date, cache_root = args
+    # кеш общий для запуска (<out>.cache), а не для даты: Chrome воркера переживает смену дат,
+    # а одновременно писать в один каталог кеша нескольким Chrome нельзя — у каждого воркера свой подкаталог
+    cache_dir = os.path.join(cache_root, f"worker-{_worker_slot}") if cache_root else None
+    crawler = None
+    try:
+        # Chrome принадлежит процессу-воркеру, а не краулеру: close() его не закрывает,
+        # даже если краулер запустил его сам (первая дата воркера или рестарт)
+        crawler = AllPriborsCrawler(rn=rn, headless=headless, out=shard_out, date=date,
+                                    cache=cache_dir is not None, cache_dir=cache_dir,
+                                    driver=_pooled_driver, owns_driver=False)
+        crawler.crawl()
+        return shard_out
+    except Exception as e:
+        logger.error(f"[POOL] Ошибка воркера для даты {date}: {e}")
+        return None
+    finally:
+        # драйвер мог быть перезапущен внутри crawl — в пул возвращается актуальный
+        if crawler is not None:
+            _pooled_driver = crawler.driver
+
+
+_CSV_SPECIAL = re.compile(r'[",\r\n]')
+
+
+def _csv_field(v) -> str:
+    """Одно поле CSV в том же виде, что и csv.writer (QUOTE_MINIMAL)."""
+    if v is None:
+        return ''
+    s = v if isinstance(v, str) else str(v)
+    if _CSV_SPECIAL.search(s):
+        return '"' + s.replace('"', '""') + '"'
+    return s
+
+
+def _make_csv_line_formatter(fieldnames: List[str]) -> Callable[[Dict[str, Any]], str]:
+    """Возвращает функцию record -> строка CSV (с \\r\\n) для фиксированного набора полей."""
+    keys = tuple(fieldnames)
+
+    def fmt(record: Dict[str, Any]) -> str:
+        return ",".join([_csv_field(record.get(k)) for k in keys]) + "\r\n"
+
+    return fmt
+
+
+@lru_cache(maxsize=4096)
+def _parse_rec_date(s: str):
+    """
+    Парсит Дату поверки: ДД.ММ.ГГГГ (как на сайте) или ГГГГ-ММ-ДД, иначе None.
+    Формат выбирается по разделителю, без перебора strptime; значения повторяются, поэтому кешируем.
+    """
+    s = s.strip()
+    if not s:
+        return None
+    try:
+        if '.' in s:
+            d, m, y = s.split('.')
+            return datetime(int(y), int(m), int(d)).date()
+        return datetime.fromisoformat(s).date()
+    except ValueError:
+        return None
+
+
 class AllPriborsCrawler:
     """
     Краулер с поддержкой восстановления прогресса.
@@ -95,46 +317,70 @@ class AllPriborsCrawler:
       },
       ...
     }
+    В памяти ключи page_stats — int; в строки они превращаются только при сохранении (OPT_NON_STR_KEYS).
     """
 
+    # фиксированный набор атрибутов: без __dict__ у экземпляра и с быстрым доступом к полям в горячих циклах
+    __slots__ = (
+        "rn", "base_url", "out", "headless", "date", "date_range", "workers", "cache", "cache_dir",
+        "_mode", "_range_bounds", "_single_target",
+        "driver", "wait", "_owns_driver",
+        "fieldnames", "_fieldnames_set", "collected", "_page_counts", "_page_rows",
+        "csv_existed_on_start", "csvfile", "_csv_fmt",
+        "progress_all", "progress", "_progress_log", "_progress_dirty",
+        "_pending_progress_pages", "_last_progress_compact",
+    )
+
     def __init__(self, rn: str, headless: bool = True, out: str = "output.csv",
-                 date: Optional[str] = None, date_range: Optional[str] = None):
+                 date: Optional[str] = None, date_range: Optional[str] = None, workers: int = 1,
+                 cache: bool = False, cache_dir: Optional[str] = None,
+                 driver=None, owns_driver: bool = True):
         self.rn = rn
         self.base_url = f"https://all-pribors.ru/verification-results?rn={rn}"
         self.out = out
         self.headless = headless
         self.date = date
         self.date_range = date_range
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.cache_dir = cache_dir
+
+        # режим отбора записей и границы дат считаем один раз
+        self._init_date_mode()
 
-        self.driver = None
-        self.wait = None
+        # driver — уже запущенный Chrome из пула воркера (может быть None до первой даты);
+        # при owns_driver=False close() не закрывает ни его, ни Chrome, запущенный взамен
+        self.driver = driver
+        self.wait = WebDriverWait(driver, DEFAULT_WAIT) if driver else None
+        self._owns_driver = owns_driver
 
-        # CSV in-memory
-        self.records: List[Dict[str, Any]] = []
+        # CSV: записи в памяти не храним, только заголовок и счётчики
         self.fieldnames: List[str] = []
+        self._fieldnames_set: set = set()  # для O(1)-проверки новых полей
         self.collected = 0
+        # (date_key, page) -> количество записей; обновляется в _store_card
+        self._page_counts: Counter = Counter()
+        # карточки текущей страницы, ещё не записанные в CSV
+        self._page_rows: List[Dict[str, Any]] = []
 
         # progress structures
         self.progress_all: Dict[str, Any] = {}
         self.progress: Dict[str, Any] = {"dates": {}, "updated_at": None}
+        # журнал изменений прогресса (JSONL): дописываем события, JSON переписываем редко
+        self._progress_log = None
+        self._progress_dirty = False  # есть изменения, ещё не попавшие в .progress.json
+        self._pending_progress_pages = 0
+        self._last_progress_compact = time.monotonic()
 
         # was csv present on start? (флаг восстановления)
         self.csv_existed_on_start = os.path.exists(self.out)
 
-        # load progress and CSV if present
+        # load progress and scan CSV if present
         self._load_progress_and_csv_if_present()
 
-        # open CSV for rewriting (we keep records in memory and rewrite fully to keep header sync)
-        self.csvfile = open(self.out, "w", newline="", encoding="utf-8")
-        if self.fieldnames:
-            try:
-                writer = csv.DictWriter(self.csvfile, fieldnames=self.fieldnames)
-                writer.writeheader()
-                if self.records:
-                    writer.writerows(self.records)
-                    self.csvfile.flush()
-            except Exception as e:
-                logger.error(f"[CSV] Ошибка при инициализации CSV: {e}")
+        # CSV открываем на дозапись: новые строки только дописываются в конец (см. _write_record)
+        self._csv_fmt: Optional[Callable[[Dict[str, Any]], str]] = None
+        self._open_csv_for_append()
 
     # --------------------
     # Progress helpers
@@ -143,16 +389,29 @@ class AllPriborsCrawler:
         base, _ = os.path.splitext(self.out)
         return base + ".progress.json"
 
+    def _progress_log_path(self) -> str:
+        base, _ = os.path.splitext(self.out)
+        return base + ".progress.jsonl"
+
+    def _cache_dir(self) -> str:
+        if self.cache_dir:
+            return os.path.abspath(self.cache_dir)
+        base, _ = os.path.splitext(self.out)
+        return os.path.abspath(base + ".cache")
+
     def _load_progress_and_csv_if_present(self):
         """Загружает прогресс (весь файл) и CSV-строки для текущего rn (если есть)."""
         ppath = self._progress_path()
         if os.path.exists(ppath):
             try:
-                with open(ppath, "r", encoding="utf-8") as pf:
-                    self.progress_all = json.load(pf) or {}
+                with open(ppath, "rb") as pf:
+                    self.progress_all = orjson.loads(pf.read()) or {}
+                self._coerce_page_keys()
             except Exception as e:
                 logger.error(f"[PROGRESS] Не удалось прочитать {ppath}: {e}. Продолжаем без прогресса.")
                 self.progress_all = {}
+        # события, записанные после последнего сохранения JSON
+        self._replay_progress_log()
 
         # если для текущего rn есть запись — используем её
         if self.rn in self.progress_all:
@@ -162,43 +421,119 @@ class AllPriborsCrawler:
             # инициализируем структуру под rn
             self.progress = {"dates": {}, "updated_at": None}
 
-        # загрузка CSV (если есть) — для реконструкции page_stats
-        if os.path.exists(self.out):
-            try:
-                with open(self.out, newline='', encoding='utf-8-sig') as f:
-                    reader = csv.DictReader(f)
-                    fieldnames = reader.fieldnames or []
-                    rows_for_rn = []
-                    for row in reader:
-                        if row.get("rn") == self.rn:
-                            rows_for_rn.append(row)
-                    if rows_for_rn:
-                        logger.info(f"[CSV] Найдены существующие записи для rn={self.rn}: {len(rows_for_rn)} строк")
-                        rows_for_rn = cleanup_incomplete_pages(rows_for_rn)
-                        self.records = rows_for_rn
-                        self.fieldnames = fieldnames
-                        self.collected = len(rows_for_rn)
-                        # rebuild page_stats from CSV (CSV — источник истины при восстановлении)
-                        self._rebuild_page_stats_from_records()
-                    else:
-                        logger.info(f"[CSV] Файл {self.out} есть, но записей для rn={self.rn} не найдено.")
-            except Exception as e:
-                logger.error(f"[CSV] Ошибка чтения {self.out}: {e}. Продолжаем без предварительной загрузки CSV.")
-        else:
-            self.records = []
-            self.fieldnames = []
+        # потоковый проход по CSV (если есть) — для реконструкции page_stats
+        try:
+            self._rebuild_page_stats_from_csv()
+        except Exception as e:
+            logger.error(f"[CSV] Ошибка чтения {self.out}: {e}. Продолжаем без предварительной загрузки CSV.")
+
+    def _coerce_page_keys(self):
+        """Переводит ключи page_stats, прочитанные из JSON строками, в int."""
+        for prog in self.progress_all.values():
+            if not isinstance(prog, dict):
+                continue
+            for d in (prog.get("dates") or {}).values():
+                ps = d.get("page_stats")
+                if isinstance(ps, dict):
+                    d["page_stats"] = {int(k): v for k, v in ps.items()}
+
+    def _replay_progress_log(self):
+        """Применяет к progress_all события из журнала .progress.jsonl (если он остался от прошлого запуска)."""
+        lpath = self._progress_log_path()
+        if not os.path.exists(lpath):
+            return
+        applied = 0
+        with open(lpath, "rb") as lf:
+            for line in lf:
+                try:
+                    ev = orjson.loads(line)
+                    rn, date_key = ev["rn"], ev["date_key"]
+                    prog = self.progress_all.setdefault(rn, {"dates": {}, "updated_at": None})
+                    d = prog.setdefault("dates", {}).setdefault(date_key, {"last_page": 0, "collected": 0, "page_stats": {}})
+                    page = ev.get("page")
+                    if page is not None:
+                        page = int(page)
+                        if ev.get("count") is not None:
+                            d.setdefault("page_stats", {})[page] = {"cards_collected": int(ev["count"])}
+                        d["last_page"] = max(d.get("last_page", 0), page)
+                    d["collected"] = ev.get("collected", d.get("collected", 0))
+                    prog["updated_at"] = ev.get("t", prog.get("updated_at"))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    # недописанная последняя строка при аварийном завершении или битое событие
+                    # (orjson.JSONDecodeError — подкласс ValueError)
+                    continue
+                applied += 1
+        if applied:
+            logger.info(f"[PROGRESS] Применено {applied} событий из {lpath}")
+
+    def _record_progress_delta(self, date_key: str, page: Optional[int] = None, count: Optional[int] = None):
+        """
+        Дописывает изменение прогресса одной строкой в .progress.jsonl (вместо полной перезаписи JSON).
+        Сам JSON переписывается не чаще раза в PROGRESS_COMPACT_INTERVAL секунд и при close().
+        """
+        try:
+            # CSV должен попасть на диск не позже прогресса (единственный flush CSV вне close/сохранения JSON)
+            if not self.csvfile.closed:
+                self.csvfile.flush()
+            if self._progress_log is None:
+                self._progress_log = open(self._progress_log_path(), "ab", buffering=PROGRESS_LOG_BUFFER_SIZE)
+            ev = {"rn": self.rn, "date_key": date_key, "page": page, "count": count,
+                  "collected": self.collected, "t": datetime.now().isoformat()}
+            self._progress_log.write(orjson.dumps(ev) + b"\n")
+            # событие должно попасть в файл сразу: иначе при сбое журнал теряет всё с последнего сжатия
+            self._progress_log.flush()
+        except Exception as e:
+            logger.error(f"[PROGRESS] Ошибка записи журнала прогресса: {e}")
+        self._mark_progress_dirty(pages=1 if page is not None else 0)
+
+    def _mark_progress_dirty(self, pages: int = 1):
+        self._progress_dirty = True
+        self._pending_progress_pages += pages
+        self._maybe_flush_progress()
+
+    def _maybe_flush_progress(self, min_interval: float = PROGRESS_COMPACT_INTERVAL,
+                              min_pages: int = PROGRESS_FLUSH_PAGES):
+        """Переписывает .progress.json, только если накопилось min_pages страниц или прошло min_interval секунд."""
+        if not self._progress_dirty:
+            return
+        if (self._pending_progress_pages >= min_pages
+                or time.monotonic() - self._last_progress_compact >= min_interval):
+            self._save_progress_all()
+
+    def _truncate_progress_log(self):
+        """Журнал больше не нужен: всё, что в нём было, уже в .progress.json."""
+        if self._progress_log is not None:
+            self._progress_log.close()
+            self._progress_log = None
+        try:
+            os.remove(self._progress_log_path())
+        except FileNotFoundError:
+            pass
 
     def _save_progress_all(self):
-        """Сохраняет весь progress_all в JSON-файл (atomic)."""
+        """Сохраняет весь progress_all в JSON-файл (atomic) и очищает журнал .progress.jsonl."""
         path = self._progress_path()
         try:
+            # CSV должен попасть на диск не позже прогресса, иначе при восстановлении
+            # прогресс будет ссылаться на строки, которых нет в файле
+            if getattr(self, "csvfile", None) is not None and not self.csvfile.closed:
+                self.csvfile.flush()
+                os.fsync(self.csvfile.fileno())
             self.progress["updated_at"] = datetime.now().isoformat()
             # put current progress under rn
             self.progress_all[self.rn] = self.progress
             tmp = path + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(self.progress_all, f, ensure_ascii=False, indent=2)
+            data = orjson.dumps(self.progress_all, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            with open(tmp, "wb") as f:
+                f.write(data)
+                # без fsync после сбоя питания os.replace может оставить пустой файл
+                f.flush()
+                os.fsync(f.fileno())
             os.replace(tmp, path)
+            self._truncate_progress_log()
+            self._progress_dirty = False
+            self._pending_progress_pages = 0
+            self._last_progress_compact = time.monotonic()
             logger.debug(f"[PROGRESS] Сохранён {path}")
         except Exception as e:
             logger.error(f"[PROGRESS] Ошибка при сохранении прогресса: {e}")
@@ -217,6 +552,63 @@ class AllPriborsCrawler:
         except Exception:
             return None
 
+    def _init_date_mode(self):
+        """
+        Вычисляет режим отбора записей по дате поверки:
+         - 'range'  — задан date_range (границы в self._range_bounds)
+         - 'single' — задана одна дата (self._single_target)
+         - 'all'    — дата не задана
+        """
+        self._range_bounds = self._parse_date_range()
+        self._single_target = None
+        if self.date_range:
+            self._mode = "range"
+        elif self.date:
+            self._mode = "single"
+            try:
+                self._single_target = datetime.strptime(self.date, "%Y-%m-%d").date()
+            except Exception:
+                self._single_target = None
+        else:
+            self._mode = "all"
+
+    @staticmethod
+    def _parse_date_value(rec_date_val: Optional[str]):
+        """Парсит значение Даты поверки (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД) в date или None."""
+        if not rec_date_val:
+            return None
+        return _parse_rec_date(rec_date_val)
+
+    @staticmethod
+    def _to_page(page_val) -> Optional[int]:
+        """Номер страницы как int (в CSV он хранится строкой) или None."""
+        try:
+            return int(page_val) if page_val not in (None, "") else None
+        except Exception:
+            return None
+
+    @classmethod
+    def _record_page(cls, rec: Dict[str, Any]) -> Optional[int]:
+        return cls._to_page(rec.get("page"))
+
+    def _date_key_for_value(self, rec_date_val: Optional[str]) -> Optional[str]:
+        """Возвращает ключ прогресса для Даты поверки записи или None, если запись вне текущего режима."""
+        if self._mode == "all":
+            return "ALL"
+        rec_date = self._parse_date_value(rec_date_val)
+        if not rec_date:
+            return None
+        if self._mode == "range":
+            if self._range_bounds and self._range_bounds[0] <= rec_date <= self._range_bounds[1]:
+                return self.date_range
+            return None
+        if self._single_target and rec_date == self._single_target:
+            return self.date
+        return None
+
+    def _date_key_for_record(self, rec: Dict[str, Any]) -> Optional[str]:
+        return self._date_key_for_value(rec.get(DATE_FIELD_NAME))
+
     def _get_date_key_for_mode(self, date: Optional[str]) -> str:
         """
         Возвращает ключ прогресса:
@@ -236,81 +628,77 @@ class AllPriborsCrawler:
             d["page_stats"] = {}
         return d
 
-    def _rebuild_page_stats_from_records(self):
+    def _rebuild_page_stats_from_csv(self):
         """
-        Реконструирует page_stats из self.records.
+        Реконструирует page_stats, self._page_counts, self.collected и self.fieldnames
+        одним потоковым проходом по CSV (записи в память не загружаются).
+        Неполные страницы (кроме последней) удаляются из CSV — они будут собраны заново.
         Важно: если при запуске указан date_range — все записи с Датой поверки внутри диапазона
         попадают в один ключ = строка date_range. Если указана одна дата — учитываем только записи с этой датой.
         Если дата не указана — все записи относятся к 'ALL'.
         """
-        logger.info("[PROGRESS] Реконструкция page_stats из CSV...")
-        # prepare date_range bounds if present
-        range_bounds = self._parse_date_range()
-
-        # temporary aggregation: date_key -> page_str -> count
-        agg: Dict[str, Dict[str, int]] = {}
-
-        for rec in self.records:
-            # page normalization
-            page_val = rec.get("page")
-            try:
-                p = int(page_val) if page_val not in (None, "") else None
-            except Exception:
-                p = None
-            if p is None:
-                # если нет данных о странице — пропускаем при расчёте page_stats
-                continue
+        self._page_counts = Counter()
+        self.collected = 0
+        if not os.path.exists(self.out):
+            return
+
+        page_sizes: Counter = Counter()  # page -> записей rn (для поиска неполных страниц)
+        with open(self.out, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                return
+            self.fieldnames = header
+            self._fieldnames_set = set(header)
+            rn_i = header.index("rn") if "rn" in self._fieldnames_set else None
+            page_i = header.index("page") if "page" in self._fieldnames_set else None
+            date_i = header.index(DATE_FIELD_NAME) if DATE_FIELD_NAME in self._fieldnames_set else None
+            if rn_i is None:
+                return
 
-            # determine record's date (as date object) if possible
-            rec_date_val = rec.get(DATE_FIELD_NAME)
-            rec_date = None
-            if rec_date_val:
-                for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
-                    try:
-                        rec_date = datetime.strptime(rec_date_val.strip(), fmt).date()
-                        break
-                    except Exception:
-                        rec_date = None
-
-            # decide which date_key this rec belongs to
-            if self.date_range and range_bounds:
-                start, end = range_bounds
-                if rec_date and start <= rec_date <= end:
-                    date_key = self.date_range
-                else:
-                    # запись вне диапазона — не относим её к текущему date_range
-                    # NOTE: мы НЕ удаляем такие записи из CSV, просто не включаем в агрегат для date_range
+            for row in reader:
+                if len(row) <= rn_i or row[rn_i] != self.rn:
                     continue
-            elif self.date:
-                # single date mode: include only recs matching the date
-                try:
-                    target = datetime.strptime(self.date, "%Y-%m-%d").date()
-                    if rec_date and rec_date == target:
-                        date_key = self.date
-                    else:
-                        # не та дата — пропускаем
-                        continue
-                except Exception:
+                self.collected += 1
+                p = self._to_page(row[page_i]) if page_i is not None and page_i < len(row) else None
+                if p is None:
+                    # если нет данных о странице — пропускаем при расчёте page_stats
                     continue
-            else:
-                # ALL mode: все записи относим в ALL
-                date_key = "ALL"
+                page_sizes[p] += 1
+                # decide which date_key this rec belongs to
+                # NOTE: записи вне текущего режима мы НЕ удаляем из CSV, просто не включаем в агрегат
+                rec_date_val = row[date_i] if date_i is not None and date_i < len(row) else None
+                date_key = self._date_key_for_value(rec_date_val)
+                if date_key is not None:
+                    self._page_counts[(date_key, p)] += 1
+
+        if not self.collected:
+            logger.info(f"[CSV] Файл {self.out} есть, но записей для rn={self.rn} не найдено.")
+            return
+        logger.info(f"[CSV] Найдены существующие записи для rn={self.rn}: {self.collected} строк")
+        logger.info("[PROGRESS] Реконструкция page_stats из CSV...")
+
+        incomplete = find_incomplete_pages(page_sizes, CARDS_PER_PAGE)
+        if incomplete:
+            logger.info(f"[CSV] Удаляю записи неполных страниц {sorted(incomplete)} — они будут собраны заново.")
+            self._rewrite_csv(keep=lambda row: row.get("rn") != self.rn or self._record_page(row) not in incomplete)
+            self.collected -= sum(page_sizes[p] for p in incomplete)
+            self._page_counts = Counter({k: v for k, v in self._page_counts.items() if k[1] not in incomplete})
 
-            agg.setdefault(date_key, {}).setdefault(str(p), 0)
-            agg[date_key][str(p)] += 1
+        # temporary aggregation: date_key -> page -> count
+        agg: Dict[str, Dict[int, int]] = {}
+        for (date_key, p), cnt in self._page_counts.items():
+            agg.setdefault(date_key, {})[p] = cnt
 
         # merge agg into self.progress
         for date_key, pages_map in agg.items():
             pd = self._get_progress_for_date_key(date_key)
             pd["page_stats"] = {}
-            for p_str, cnt in pages_map.items():
-                pd["page_stats"][p_str] = {"cards_collected": int(cnt)}
+            for p, cnt in pages_map.items():
+                pd["page_stats"][p] = {"cards_collected": int(cnt)}
             # recompute collected and last_page
-            try:
-                pd["collected"] = sum(int(v.get("cards_collected", 0)) for v in pd["page_stats"].values())
-                pd["last_page"] = max(int(k) for k in pd["page_stats"].keys()) if pd["page_stats"] else pd.get("last_page", 0)
-            except Exception:
-                pass
+            pd["collected"] = sum(pages_map.values())
+            pd["last_page"] = max(pages_map) if pages_map else pd.get("last_page", 0)
 
         # save progress
         self._save_progress_all()
@@ -327,20 +715,62 @@ class AllPriborsCrawler:
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--window-size=1920,1080")
-        prefs = {"profile.managed_default_content_settings.images": 2}
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-features=IsolateOrigins,site-per-process")
+        if self.cache:
+            # постоянный дисковый HTTP-кеш Chrome: переживает перезапуски, но хранит только то, что сайт
+            # разрешает кешировать заголовками (на деле — JS-бандлы); HTML страниц и данные карточек не кешируются
+            chrome_options.add_argument(f"--disk-cache-dir={self._cache_dir()}")
+            chrome_options.add_argument(f"--disk-cache-size={HTTP_CACHE_SIZE}")
+        # картинки, стили и шрифты не нужны: данные берутся только из текста DOM
+        prefs = {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+        }
         chrome_options.add_experimental_option("prefs", prefs)
+        # driver.get возвращается после DOMContentLoaded; полную загрузку дожидаемся опросом readyState
+        chrome_options.page_load_strategy = "eager"
         self.driver = webdriver.Chrome(options=chrome_options)
         #self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        try:
+            # prefs отключает только отрисовку, а CDP не даёт ресурсы и аналитику даже скачивать
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except WebDriverException as e:
+            logger.warning(f"[DRIVER] Не удалось включить блокировку ресурсов через CDP: {e}")
+        self.driver.set_script_timeout(SCRIPT_TIMEOUT)
         self.wait = WebDriverWait(self.driver, DEFAULT_WAIT)
         logger.info("[DRIVER] Chrome инициализирован")
 
-    def _restart_driver(self):
+    def _driver_alive(self) -> bool:
+        """Проверяет, что сессия Chrome жива (chromedriver отвечает и session_id валиден)."""
+        if not self.driver or not self.driver.session_id:
+            return False
+        try:
+            _ = self.driver.current_url
+            return True
+        except (WebDriverException, MaxRetryError, ConnectionError):
+            # InvalidSessionIdException / chromedriver не отвечает
+            return False
+
+    def _restart_driver(self, force: bool = False):
+        """
+        Перезапускает Chrome только при потере сессии; если драйвер жив — сбрасывает cookies и переиспользует его.
+        force=True — перезапуск в любом случае (например, вкладка зависла на загрузке страницы).
+        """
+        if not force and self._driver_alive():
+            try:
+                self.driver.delete_all_cookies()
+                logger.info("[DRIVER] Сессия жива — переиспользую драйвер без рестарта")
+                return
+            except WebDriverException:
+                pass
         try:
             if self.driver:
                 self.driver.quit()
         except Exception:
             pass
-        time.sleep(0.3)
         self._init_driver()
 
     # --------------------
@@ -400,14 +830,14 @@ class AllPriborsCrawler:
         except TimeoutException:
             logger.error(f"[NAV] Таймаут загрузки: {url}. Рестарт драйвера.")
             try:
-                self._restart_driver()
+                self._restart_driver(force=True)
                 self.driver.set_page_load_timeout(page_load_timeout)
                 self.driver.get(url)
             except TimeoutException:
                 logger.error("[NAV] Повторный таймаут после рестарта. Жду 5 минут.")
                 time.sleep(300)
                 try:
-                    self._restart_driver()
+                    self._restart_driver(force=True)
                     self.driver.set_page_load_timeout(page_load_timeout)
                     self.driver.get(url)
                 except Exception as e:
@@ -419,21 +849,38 @@ class AllPriborsCrawler:
         except WebDriverException as e:
             logger.error(f"[NAV] WebDriverException: {e}")
             raise
-        time.sleep(1)
+        self._wait_document_complete()
+        try:
+            WebDriverWait(self.driver, PAGE_READY_TIMEOUT, poll_frequency=WAIT_POLL).until(
+                EC.presence_of_element_located(TOTAL_COUNT_LOC)
+            )
+        except TimeoutException:
+            logger.debug(f"[NAV] Счётчик результатов не появился за {PAGE_READY_TIMEOUT} с: {url}")
+
+    def _wait_document_complete(self, timeout: float = PAGE_READY_TIMEOUT) -> bool:
+        """Опрашивает document.readyState до 'complete'; по таймауту продолжаем с тем, что уже загружено."""
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=WAIT_POLL).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            return True
+        except TimeoutException:
+            logger.debug(f"[NAV] Документ не догрузился за {timeout} с — продолжаю")
+            return False
 
     # --------------------
     # Scraping helpers
     # --------------------
     def get_total_found(self) -> int:
         try:
-            el = self.wait.until(EC.presence_of_element_located((By.XPATH, TOTAL_COUNT_XPATH)))
+            el = self.wait.until(EC.presence_of_element_located(TOTAL_COUNT_LOC))
             return safe_int(el.text.strip())
         except TimeoutException:
             return 0
 
     def _get_numeric_pages_from_page(self) -> List[int]:
         try:
-            els = self.driver.find_elements(By.XPATH, PAGE_BUTTONS_XPATH)
+            els = self.driver.find_elements(*PAGE_BUTTONS_LOC)
             nums = []
             for e in els:
                 txt = e.text.strip()
@@ -446,36 +893,178 @@ class AllPriborsCrawler:
         except Exception:
             return [1]
 
+    def _wait_for_card_buttons(self, timeout: float = PAGE_READY_TIMEOUT, allow_empty: bool = False) -> bool:
+        """
+        Ждёт, пока первая кнопка карточки станет кликабельной.
+        allow_empty=True — также считаем готовностью отсутствие кнопок (все карточки уже открыты).
+        """
+        clickable = EC.element_to_be_clickable(CARD_BUTTON_LOC)
+
+        def ready(d):
+            if allow_empty and not d.find_elements(*CARD_BUTTON_LOC):
+                return True
+            return clickable(d)
+
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=WAIT_POLL).until(ready)
+            return True
+        except TimeoutException:
+            return False
+
+    def _click_page_link(self, page_num: int) -> bool:
+        """
+        Переходит на страницу кликом по ссылке пагинации (без полной перезагрузки через driver.get).
+        Возвращает False, если ссылки нет или переход не подтвердился — тогда нужен _navigate_to_page.
+        """
+        try:
+            links = self.driver.find_elements(By.XPATH, PAGE_LINK_XPATH.format(page_num))
+            if not links:
+                return False
+            # любой элемент списка карточек: после перехода он должен исчезнуть из DOM
+            markers = (self.driver.find_elements(*CARD_BUTTON_LOC)
+                       or self.driver.find_elements(*OPENED_CARD_LOC))
+            if not markers:
+                return False
+            logger.info(f"[NAV] Клик по ссылке страницы {page_num}")
+            self.driver.execute_script(CLICK_JS, links[0])
+            wait = WebDriverWait(self.driver, PAGE_READY_TIMEOUT, poll_frequency=WAIT_POLL)
+            wait.until(EC.staleness_of(markers[0]))
+            wait.until(EC.presence_of_element_located(TOTAL_COUNT_LOC))
+            return True
+        except (TimeoutException, WebDriverException) as e:
+            logger.debug(f"[NAV] Переход кликом на страницу {page_num} не удался: {e}")
+            return False
+
+    def _wait_for_card_js(self, before_count: int, timeout_ms: int = (DEFAULT_WAIT + 10) * 1000) -> bool:
+        """
+        Ждёт, пока открытых карточек станет больше before_count и в последней появятся строки таблицы.
+        Ожидание идёт в браузере (MutationObserver) одним вызовом; при ошибке JS — обычный polling.
+        """
+        try:
+            return bool(self.driver.execute_async_script(WAIT_CARD_JS, OPENED_CARD_XPATH, before_count, timeout_ms))
+        except TimeoutException:
+            return False
+        except WebDriverException as e:
+            logger.debug(f"[WAIT] JS-ожидание карточки не удалось, перехожу на polling: {e}")
+        try:
+            WebDriverWait(self.driver, timeout_ms / 1000).until(
+                lambda d: (
+                    len(d.find_elements(*OPENED_CARD_LOC)) > before_count
+                    and
+                    len(d.find_elements(*OPENED_CARD_LOC)[-1].find_elements(*TABLE_ROWS_LOC)) > 0
+                )
+            )
+            return True
+        except TimeoutException:
+            return False
+
     def _click_button_with_retry(self, button_element):
         for attempt in range(1, CLICK_RETRIES + 1):
             try:
-                self.driver.execute_script(
-                    "arguments[0].scrollIntoView({block:'center', inline:'nearest'});", button_element
-                )
-                time.sleep(0.5)
-                button_element.click()
+                if attempt == 1:
+                    # JS-клик: один round trip и не перехватывается перекрывающими элементами
+                    self.driver.execute_script(CLICK_JS, button_element)
+                else:
+                    self.driver.execute_script(
+                        "arguments[0].scrollIntoView({block:'center', inline:'nearest'});", button_element
+                    )
+                    button_element.click()
                 return True
             except (ElementClickInterceptedException, StaleElementReferenceException, WebDriverException) as e:
                 logger.debug(f"[CLICK] Попытка {attempt} не удалась: {e}")
                 time.sleep(0.8 * attempt)
                 try:
-                    buttons = self.driver.find_elements(By.XPATH, CARD_BUTTON_XPATH)
+                    buttons = self.driver.find_elements(*CARD_BUTTON_LOC)
                     if buttons:
                         button_element = buttons[0]
                 except Exception:
                     pass
         return False
 
+    def _open_all_cards_js(self, max_cards: int) -> Optional[List[Dict[str, str]]]:
+        """
+        Открывает до max_cards карточек страницы одним JS-циклом и возвращает их таблицы.
+        Если JS-цикл прервался, возвращаются таблицы карточек, успевших открыться.
+        None — прочитать карточки не удалось; тогда карточки открываются по одной.
+        """
+        per_card_ms = (DEFAULT_WAIT + 10) * 1000
+        # бюджет проверяется только перед очередным кликом, а одна карточка может ждать per_card_ms —
+        # запас нужен, чтобы скрипт гарантированно уложился в SCRIPT_TIMEOUT
+        budget_ms = SCRIPT_TIMEOUT * 1000 - per_card_ms - 5000
+        try:
+            before = len(self.driver.find_elements(*OPENED_CARD_LOC))
+        except WebDriverException as e:
+            logger.debug(f"[BATCH] Не удалось посчитать открытые карточки: {e}")
+            return None
+        try:
+            start = self.driver.execute_async_script(
+                OPEN_ALL_CARDS_JS, CARD_BUTTON_XPATH, OPENED_CARD_XPATH, max_cards, per_card_ms, budget_ms
+            )
+        except WebDriverException as e:
+            # часть карточек могла открыться до ошибки — забираем их, иначе поштучный путь их не прочитает
+            logger.debug(f"[BATCH] Пакетное открытие карточек прервано: {e}")
+            start = before
+        if not isinstance(start, int):
+            start = before
+        return self._extract_cards_js(start)
+
+    def _extract_cards_js(self, start: int = 0) -> Optional[List[Dict[str, str]]]:
+        """
+        Читает таблицы всех открытых карточек страницы (начиная с индекса start) одним execute_script.
+        Пустые или битые строки перечитываются через Selenium только для соответствующих карточек;
+        карточка, которую не удалось прочитать и так, пропускается (страница останется неполной и будет пересобрана).
+        """
+        try:
+            tables = self.driver.execute_script(EXTRACT_CARDS_JS, OPENED_CARD_XPATH, start)
+        except WebDriverException as e:
+            logger.debug(f"[EXTRACT] Пакетное JS-извлечение не удалось: {e}")
+            return None
+        if not isinstance(tables, list):
+            return None
+
+        cards = None
+        records = []
+        for i, data in enumerate(tables):
+            if isinstance(data, dict) and data:
+                records.append(data)
+                continue
+            if cards is None:
+                try:
+                    cards = self.driver.find_elements(*OPENED_CARD_LOC)
+                except WebDriverException as e:
+                    logger.debug(f"[EXTRACT] Не удалось получить карточки для построчного чтения: {e}")
+                    cards = []
+            # JS для этой карточки уже вернул пустую таблицу — повторять его нет смысла
+            data = self._extract_rows_selenium(cards[start + i]) if start + i < len(cards) else {}
+            if data:
+                records.append(data)
+            else:
+                logger.warning(f"[EXTRACT] Карточка #{start + i + 1} пустая — пропускаю.")
+        return records
+
     def _extract_from_opened_card(self, card_element):
-        record = {"rn": self.rn}
+        # быстрый путь: вся таблица одним запросом к браузеру
+        try:
+            data = self.driver.execute_script(EXTRACT_CARD_JS, card_element)
+            # пустая таблица — тоже неудача JS-пути
+            if isinstance(data, dict) and data:
+                return {"rn": self.rn, **data}
+        except WebDriverException as e:
+            logger.debug(f"[EXTRACT] JS-извлечение не удалось, читаю построчно: {e}")
+
+        return {"rn": self.rn, **self._extract_rows_selenium(card_element)}
+
+    def _extract_rows_selenium(self, card_element) -> Dict[str, str]:
+        """Таблица карточки {th: td} построчно через Selenium (запасной путь, по запросу на ячейку)."""
+        record = {}
         try:
-            rows = card_element.find_elements(By.XPATH, ".//tr")
+            rows = card_element.find_elements(*TABLE_ROWS_LOC)
         except Exception:
             rows = []
         for row in rows:
             try:
-                th = row.find_element(By.TAG_NAME, "th").text.strip().replace("\n", "")
-                td = row.find_element(By.TAG_NAME, "td").text.strip().replace("\n", "")
+                th = row.find_element(*TH_LOC).text.strip().replace("\n", "")
+                td = row.find_element(*TD_LOC).text.strip().replace("\n", "")
                 if th:
                     record[th] = td
             except Exception:
@@ -485,70 +1074,94 @@ class AllPriborsCrawler:
     # --------------------
     # CSV helpers
     # --------------------
-    def _write_record(self, record: dict):
+    def _open_csv_for_append(self):
+        self.csvfile = open(self.out, "a", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE)
+        # строка CSV для дозаписи формируется напрямую, без csv.DictWriter (набор полей фиксирован)
+        self._csv_fmt = _make_csv_line_formatter(self.fieldnames) if self.fieldnames else None
+
+    def _rewrite_csv(self, keep=None, extra_rows=()):
+        """
+        Потоково переписывает CSV под текущие self.fieldnames через временный файл.
+        keep(row) -> bool отбирает существующие строки, extra_rows дописываются в конец.
+        Нужно только при изменении набора полей, очистке неполных страниц и слиянии шардов.
+        """
+        reopen = getattr(self, "csvfile", None) is not None and not self.csvfile.closed
+        if reopen:
+            self.csvfile.close()
+        tmp = self.out + ".tmp"
+        try:
+            with open(tmp, "w", newline="", encoding="utf-8") as dst:
+                writer = csv.DictWriter(dst, fieldnames=self.fieldnames, extrasaction="ignore")
+                writer.writeheader()
+                if os.path.exists(self.out):
+                    with open(self.out, newline="", encoding="utf-8-sig") as src:
+                        for row in csv.DictReader(src):
+                            if keep is None or keep(row):
+                                writer.writerow(row)
+                writer.writerows(extra_rows)
+            os.replace(tmp, self.out)
+        finally:
+            if reopen:
+                self._open_csv_for_append()
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        """Дописывает пачку записей в CSV одним write (или переписывает файл, если появились новые поля)."""
         # update headers
-        new_keys = [k for k in record.keys() if k not in self.fieldnames]
+        new_keys = []
+        for record in records:
+            for k in record:
+                if k not in self._fieldnames_set:
+                    self.fieldnames.append(k)
+                    self._fieldnames_set.add(k)
+                    new_keys.append(k)
         if new_keys:
-            self.fieldnames.extend(new_keys)
             logger.info(f"[CSV] Новые поля: {new_keys}")
-        if "page" not in self.fieldnames:
+        if "page" not in self._fieldnames_set:
             self.fieldnames.append("page")
-
-        self.records.append(record)
+            self._fieldnames_set.add("page")
+            new_keys.append("page")
 
         try:
-            self.csvfile.seek(0)
-            self.csvfile.truncate()
-            writer = csv.DictWriter(self.csvfile, fieldnames=self.fieldnames)
-            writer.writeheader()
-            for r in self.records:
-                writer.writerow(r)
-            self.csvfile.flush()
+            if new_keys or self._csv_fmt is None:
+                # заголовок изменился — переписываем файл под новый набор полей
+                self._rewrite_csv(extra_rows=records)
+            else:
+                # обычный случай: дописываем строки, сброс на диск делает буферизация
+                self.csvfile.write("".join([self._csv_fmt(r) for r in records]))
+            self.collected += len(records)
         except Exception as e:
             logger.error(f"[CSV] Ошибка записи: {e}")
-        self.collected = len(self.records)
-        logger.info(f"[CSV] Сохранено (в памяти): {self.collected}")
+        logger.info(f"[CSV] Сохранено: {self.collected}")
+
+    def _count_record(self, rec: Dict[str, Any], delta: int = 1):
+        p = self._record_page(rec)
+        date_key = self._date_key_for_record(rec)
+        if p is not None and date_key is not None:
+            self._page_counts[(date_key, p)] += delta
+
+    def _store_card(self, rec: Dict[str, Any], page_num: int, date: Optional[str]):
+        """Кладёт карточку в буфер текущей страницы; в CSV она попадёт в _flush_page_rows."""
+        rec["page"] = page_num
+        # if date filter used and rec lacks DATE_FIELD_NAME -> fill it, helps counting
+        if date and (DATE_FIELD_NAME not in rec or not rec.get(DATE_FIELD_NAME)):
+            rec[DATE_FIELD_NAME] = date
+        self._page_rows.append(rec)
+        self._count_record(rec)
+
+    def _flush_page_rows(self):
+        """Записывает карточки обработанной страницы в CSV одной пачкой."""
+        if self._page_rows:
+            self._write_records(self._page_rows)
+            self._page_rows = []
+
+    def _discard_page_rows(self):
+        """Отбрасывает карточки прерванной страницы (при повторной попытке она собирается заново)."""
+        for rec in self._page_rows:
+            self._count_record(rec, -1)
+        self._page_rows = []
 
     def _count_records_for_date_and_page(self, date_key: str, page_num: int) -> int:
-        cnt = 0
-        for rec in self.records:
-            # normalize page
-            page_val = rec.get("page")
-            try:
-                p = int(page_val) if page_val not in (None, "") else None
-            except Exception:
-                p = None
-            if p != page_num:
-                continue
-            # determine rec_date_key according to startup mode (date_range/date/ALL)
-            rec_date_val = rec.get(DATE_FIELD_NAME)
-            rec_date = None
-            if rec_date_val:
-                for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
-                    try:
-                        rec_date = datetime.strptime(rec_date_val.strip(), fmt).date()
-                        break
-                    except Exception:
-                        rec_date = None
-            # mapping to date_key
-            if self.date_range:
-                bounds = self._parse_date_range()
-                if bounds and rec_date and bounds[0] <= rec_date <= bounds[1]:
-                    rec_date_key = self.date_range
-                else:
-                    # not in range -> skip
-                    continue
-            elif self.date:
-                try:
-                    target = datetime.strptime(self.date, "%Y-%m-%d").date()
-                    rec_date_key = self.date if (rec_date and rec_date == target) else None
-                except Exception:
-                    rec_date_key = None
-            else:
-                rec_date_key = "ALL"
-            if rec_date_key == date_key:
-                cnt += 1
-        return cnt
+        return self._page_counts[(date_key, page_num)]
 
     # --------------------
     # Main crawl
@@ -560,8 +1173,14 @@ class AllPriborsCrawler:
                 logger.error("[DATE] Нет дат для обработки.")
                 return
 
-            # init driver
-            self._init_driver()
+            if self.workers > 1 and len(dates_to_process) > 1:
+                self._crawl_parallel(dates_to_process)
+                self._report_and_check()
+                return
+
+            # init driver (Chrome из пула переиспользуется, если сессия жива)
+            if not self._driver_alive():
+                self._init_driver()
             logger.info(f"[START] rn={self.rn}. Даты: {dates_to_process}. CSV existed on start: {self.csv_existed_on_start}")
 
             for date in dates_to_process:
@@ -585,8 +1204,8 @@ class AllPriborsCrawler:
 
                 # decide pages to iterate:
                 existing_stats = prog.get("page_stats", {}) or {}
-                pages_with_incomplete = [int(p) for p, v in existing_stats.items() if int(v.get("cards_collected", 0)) < CARDS_PER_PAGE]
-                pages_no_stats = [p for p in all_pages if str(p) not in existing_stats]
+                pages_with_incomplete = [p for p, v in existing_stats.items() if int(v.get("cards_collected", 0)) < CARDS_PER_PAGE]
+                pages_no_stats = [p for p in all_pages if p not in existing_stats]
                 pages_to_iterate = sorted(set(pages_with_incomplete + pages_no_stats))
 
                 # if there is nothing to iterate but last_page < max -> resume forward
@@ -602,7 +1221,7 @@ class AllPriborsCrawler:
 
                 for page_num in pages_to_iterate:
                     # re-evaluate current count from memory (CSV is source of truth)
-                    existing_count = int(existing_stats.get(str(page_num), {}).get("cards_collected", 0))
+                    existing_count = int(existing_stats.get(page_num, {}).get("cards_collected", 0))
                     # last page (may legitimately have <CARDS_PER_PAGE)
                     last_page_num = max(all_pages) if all_pages else page_num
                     if existing_count >= CARDS_PER_PAGE and page_num != last_page_num:
@@ -610,7 +1229,7 @@ class AllPriborsCrawler:
                         if page_num > prog.get("last_page", 0):
                             prog["last_page"] = page_num
                             prog["collected"] = self.collected
-                            self._save_progress_all()
+                            self._record_progress_delta(date_key, page_num)
                         continue
 
                     page_success = False
@@ -620,20 +1239,33 @@ class AllPriborsCrawler:
                                 logger.info(f"--- Обрабатываю страницу {page_num} (уже открыта) ---")
                             else:
                                 logger.info(f"--- Переход к странице {page_num} (попытка {attempt}/{MAX_ATTEMPTS_PER_PAGE}) ---")
-                                self._navigate_to_page(page_num, date)
-                                time.sleep(DELAY_BETWEEN_PAGES)
+                                # первая попытка — клик по пагинации на уже загруженной странице
+                                if attempt > 1 or not self._click_page_link(page_num):
+                                    self._navigate_to_page(page_num, date)
 
-                            before_records_count = len(self.records)
+                            if not self._wait_for_card_buttons():
+                                logger.debug(f"[PAGE] Кнопки карточек не появились за {PAGE_READY_TIMEOUT} с.")
 
+                            before_records_count = self.collected
+
+                            # быстрый путь: все карточки страницы открываются и читаются одним JS-вызовом
+                            need = CARDS_PER_PAGE - self._count_records_for_date_and_page(date_key, page_num)
+                            tables = self._open_all_cards_js(need) if need > 0 else []
+                            for data in tables or []:
+                                self._store_card({"rn": self.rn, **data}, page_num, date)
+                            if tables:
+                                logger.info(f"[BATCH] Страница {page_num}: пакетно собрано {len(tables)} карточек")
+
+                            # оставшиеся карточки (если пакетный путь не сработал или прервался) — по одной
                             loop_guard = 0
-                            while True:
+                            while self._count_records_for_date_and_page(date_key, page_num) < CARDS_PER_PAGE:
                                 loop_guard += 1
                                 if loop_guard > 2000:
                                     logger.warning("[LOOP] Защитный предел итераций на странице достигнут.")
                                     break
 
                                 try:
-                                    buttons = self.driver.find_elements(By.XPATH, CARD_BUTTON_XPATH)
+                                    buttons = self.driver.find_elements(*CARD_BUTTON_LOC)
                                 except Exception:
                                     buttons = []
 
@@ -643,7 +1275,7 @@ class AllPriborsCrawler:
 
                                 btn = buttons[0]
                                 try:
-                                    before_cards_count = len(self.driver.find_elements(By.XPATH, OPENED_CARD_XPATH))
+                                    before_cards_count = len(self.driver.find_elements(*OPENED_CARD_LOC))
                                 except Exception:
                                     before_cards_count = 0
 
@@ -653,21 +1285,13 @@ class AllPriborsCrawler:
                                     time.sleep(0.5)
                                     continue
 
-                                try:
-                                    WebDriverWait(self.driver, DEFAULT_WAIT + 10).until(
-                                        lambda d: (
-                                            len(d.find_elements(By.XPATH, OPENED_CARD_XPATH)) > before_cards_count
-                                            and
-                                            len(d.find_elements(By.XPATH, OPENED_CARD_XPATH)[-1].find_elements(By.XPATH, ".//tr")) > 0
-                                        )
-                                    )
-                                except TimeoutException:
+                                if not self._wait_for_card_js(before_cards_count):
                                     logger.warning("[WARN] Новая карточка не появилась вовремя — пропускаю этот клик.")
                                     time.sleep(0.5)
                                     continue
 
                                 try:
-                                    cards = self.driver.find_elements(By.XPATH, OPENED_CARD_XPATH)
+                                    cards = self.driver.find_elements(*OPENED_CARD_LOC)
                                     if not cards:
                                         logger.warning("[WARN] После клика карточек нет.")
                                         time.sleep(0.5)
@@ -677,22 +1301,12 @@ class AllPriborsCrawler:
                                     logger.exception("[ERROR] Ошибка при получении карточки.")
                                     time.sleep(0.5)
                                     continue
-
-                                try:
-                                    WebDriverWait(self.driver, DEFAULT_WAIT).until(
-                                        lambda d, el=card_el: len(el.find_elements(By.XPATH, ".//tr")) > 0
-                                    )
-                                except TimeoutException:
-                                    logger.debug("[DEBUG] В карточке нет строк таблицы за отведённое время.")
+                                # строки таблицы в card_el уже дождались в _wait_for_card_js
 
                                 rec = self._extract_from_opened_card(card_el)
-                                rec["page"] = page_num
-                                # if date filter used and rec lacks DATE_FIELD_NAME -> fill it, helps counting
-                                if date and (DATE_FIELD_NAME not in rec or not rec.get(DATE_FIELD_NAME)):
-                                    rec[DATE_FIELD_NAME] = date
-                                self._write_record(rec)
+                                self._store_card(rec, page_num, date)
 
-                                time.sleep(DELAY_AFTER_CLICK)
+                                self._wait_for_card_buttons(allow_empty=True)
 
                                 # stop early if we collected enough for this page
                                 cnt_now = self._count_records_for_date_and_page(date_key, page_num)
@@ -700,25 +1314,29 @@ class AllPriborsCrawler:
                                     logger.info(f"[PAGE] Достигнут порог {CARDS_PER_PAGE} карточек для страницы {page_num}.")
                                     break
 
+                            self._flush_page_rows()
                             page_success = True
-                            added_now = len(self.records) - before_records_count
+                            added_now = self.collected - before_records_count
                             total_for_page = self._count_records_for_date_and_page(date_key, page_num)
 
                             # update progress
                             prog = self._get_progress_for_date_key(date_key)
                             ps = prog.setdefault("page_stats", {})
-                            ps[str(page_num)] = {"cards_collected": int(total_for_page)}
+                            ps[page_num] = {"cards_collected": int(total_for_page)}
                             prog["last_page"] = max(prog.get("last_page", 0), page_num)
                             prog["collected"] = self.collected
-                            self._save_progress_all()
+                            self._record_progress_delta(date_key, page_num, int(total_for_page))
                             logger.info(f"[PROGRESS] Страница {page_num}: добавлено {added_now}, всего на странице {total_for_page}")
                             break
                         except WebDriverException as e:
                             logger.error(f"[PAGE {page_num}] WebDriverException (attempt {attempt}): {e}")
+                            self._discard_page_rows()
                             try:
                                 self._restart_driver()
                                 self._navigate_to_page(page_num, date)
-                                time.sleep(DELAY_BETWEEN_PAGES)
+                                if not self._wait_for_card_buttons():
+                                    # кнопки не появились — даём сайту паузу перед следующей попыткой
+                                    time.sleep(DELAY_BETWEEN_PAGES)
                             except Exception as e2:
                                 logger.error(f"[PAGE {page_num}] Ошибка после рестарта: {e2}")
                                 continue
@@ -729,7 +1347,7 @@ class AllPriborsCrawler:
                         logger.error(f"[PAGE {page_num}] Не удалось обработать после {MAX_ATTEMPTS_PER_PAGE} попыток.")
                         prog = self._get_progress_for_date_key(date_key)
                         prog["collected"] = self.collected
-                        self._save_progress_all()
+                        self._record_progress_delta(date_key)
 
                 logger.info(f"[DATE] Закончена обработка {date or 'ALL'}. Собрано всего {self.collected}")
 
@@ -739,19 +1357,106 @@ class AllPriborsCrawler:
         finally:
             self.close()
 
+    # --------------------
+    # Parallel crawl (по процессу на дату)
+    # --------------------
+    def _shard_path(self, date: str) -> str:
+        base, ext = os.path.splitext(self.out)
+        return f"{base}.part-{date}{ext or '.csv'}"
+
+    def _seed_shard(self, shard: str, date: str):
+        """Переносит уже собранные записи за дату в шард, чтобы воркер продолжил с места остановки."""
+        if os.path.exists(shard) or not self.fieldnames or not os.path.exists(self.out):
+            return
+        target = datetime.strptime(date, "%Y-%m-%d").date()
+        self.csvfile.flush()
+        seeded = 0
+        with open(self.out, newline="", encoding="utf-8-sig") as src, \
+                open(shard, "w", newline="", encoding="utf-8") as dst:
+            writer = csv.DictWriter(dst, fieldnames=self.fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            for row in csv.DictReader(src):
+                if row.get("rn") == self.rn and self._parse_date_value(row.get(DATE_FIELD_NAME)) == target:
+                    writer.writerow(row)
+                    seeded += 1
+        if not seeded:
+            os.remove(shard)
+
+    def _crawl_parallel(self, dates_to_process: List[str]):
+        """
+        Обходит даты параллельно: каждый процесс держит свой Chrome (один на все его даты) и пишет в отдельный CSV-шард.
+        По завершении шарды сливаются в self.out, а page_stats пересчитываются по объединённому CSV.
+        """
+        processes = min(self.workers, os.cpu_count() or 1, MAX_WORKERS, len(dates_to_process))
+        shards = {date: self._shard_path(date) for date in dates_to_process}
+        for date, shard in shards.items():
+            self._seed_shard(shard, date)
+        logger.info(f"[POOL] rn={self.rn}. Даты: {dates_to_process}. Процессов: {processes}")
+
+        cache_root = self._cache_dir() if self.cache else None
+        tasks = [(self.rn, self.headless, shards[date], date, cache_root) for date in dates_to_process]
+        slot_counter = multiprocessing.Value("i", 0)
+        with multiprocessing.Pool(processes=processes, initializer=_init_pool_worker,
+                                  initargs=(slot_counter,)) as pool:
+            for shard in pool.imap_unordered(_crawl_date_worker, tasks):
+                if shard:
+                    logger.info(f"[POOL] Готов шард {shard}")
+            pool.close()
+            pool.join()
+
+        self._merge_shards(shards)
+
+    def _merge_shards(self, shards: Dict[str, str]):
+        """Сливает CSV-шарды в основной CSV: записи за обработанные даты берутся из шардов."""
+        present = {date: shard for date, shard in shards.items() if os.path.exists(shard)}
+        for shard in present.values():
+            with open(shard, newline="", encoding="utf-8-sig") as f:
+                for k in next(csv.reader(f), None) or []:
+                    if k not in self._fieldnames_set:
+                        self.fieldnames.append(k)
+                        self._fieldnames_set.add(k)
+        processed = {datetime.strptime(d, "%Y-%m-%d").date() for d in present}
+
+        def shard_rows():
+            for shard in present.values():
+                with open(shard, newline="", encoding="utf-8-sig") as f:
+                    for row in csv.DictReader(f):
+                        if row.get("rn") == self.rn:
+                            yield row
+
+        try:
+            self._rewrite_csv(
+                keep=lambda row: row.get("rn") != self.rn
+                or self._parse_date_value(row.get(DATE_FIELD_NAME)) not in processed,
+                extra_rows=shard_rows(),
+            )
+        except Exception as e:
+            logger.error(f"[POOL] Ошибка слияния шардов: {e}. Шарды оставлены на диске.")
+            return
+
+        for shard in present.values():
+            shard_base = os.path.splitext(shard)[0]
+            for path in (shard, shard_base + ".progress.json", shard_base + ".progress.jsonl"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self._rebuild_page_stats_from_csv()
+        logger.info(f"[POOL] Шарды объединены в {self.out}: {self.collected} записей")
+
     def _report_and_check(self):
+        if self._progress_dirty:
+            self._save_progress_all()
         logger.info(f"[REPORT] Всего собрано записей: {self.collected}")
         for date_key, dinfo in self.progress.get("dates", {}).items():
             page_stats = dinfo.get("page_stats", {}) or {}
             if not page_stats:
                 continue
-            try:
-                max_page = max(int(p) for p in page_stats.keys())
-            except Exception:
-                max_page = None
+            # last_page поддерживается при каждом обновлении page_stats — пересчитывать max не нужно
+            max_page = dinfo.get("last_page")
             incomplete = []
-            for p_str, info in page_stats.items():
-                p = int(p_str)
+            for p, info in page_stats.items():
                 if max_page is not None and p == max_page:
                     continue
                 if int(info.get("cards_collected", 0)) < CARDS_PER_PAGE:
@@ -762,13 +1467,22 @@ class AllPriborsCrawler:
                 logger.info(f"[CHECK] Для ключа {date_key} все страницы (кроме последней) полные ({CARDS_PER_PAGE}).")
 
     def close(self):
+        # свернуть журнал прогресса в .progress.json
+        if self._progress_dirty or self._progress_log is not None:
+            self._save_progress_all()
+        if self._progress_log is not None:
+            # сохранить не удалось — журнал остаётся на диске и будет применён при следующем запуске
+            self._progress_log.close()
+            self._progress_log = None
         try:
-            if self.driver:
+            if self.driver and self._owns_driver:
                 self.driver.quit()
         except Exception:
             pass
         try:
             if hasattr(self, "csvfile") and not self.csvfile.closed:
+                self.csvfile.flush()
+                os.fsync(self.csvfile.fileno())
                 self.csvfile.close()
         except Exception:
             pass
@@ -778,13 +1492,19 @@ def main():
     parser = argparse.ArgumentParser(description="Crawler for all-pribors.ru verification-results")
     parser.add_argument("--rn", required=True, help="параметр rn, например 91851-24")
     parser.add_argument("--out", default="output.csv", help="CSV-файл для вывода")
-    parser.add_argument("--headless", type=lambda x: x.lower() in ("1", "true", "yes"), default=True)
+    parser.add_argument("--headless", type=_parse_bool, nargs="?", const=True, default=True,
+                        help="True/False (по умолчанию True); без значения — True")
     parser.add_argument("--date", help="Одна дата в формате YYYY-MM-DD (например 2025-09-17)")
     parser.add_argument("--date-range", help="Диапазон дат в формате YYYY-MM-DD:YYYY-MM-DD (включительно)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"Сколько дат обходить параллельно (отдельный Chrome на процесс, не больше {MAX_WORKERS})")
+    parser.add_argument("--cache", action="store_true",
+                        help="Хранить HTTP-кеш Chrome на диске рядом с CSV (только кешируемая статика, в основном JS)")
     args = parser.parse_args()
 
     crawler = AllPriborsCrawler(rn=args.rn, headless=args.headless, out=args.out,
-                                date=args.date, date_range=args.date_range)
+                                date=args.date, date_range=args.date_range, workers=args.workers,
+                                cache=args.cache)
     try:
         crawler.crawl()
     except KeyboardInterrupt:
@@ -1,43 +1,47 @@
-from typing import List, Dict, Any
-from collections import defaultdict
+from collections import Counter
+from typing import List, Dict, Any, Set
+
+
+def find_incomplete_pages(page_sizes: Dict[int, int], expected_per_page: int = 20) -> Set[int]:
+    """
+    Возвращает номера страниц (< max_page), на которых меньше expected_per_page записей.
+    То же правило, что и в cleanup_incomplete_pages, но по готовым счётчикам (без списка записей).
+
+    :param page_sizes: количество записей по номеру страницы
+    :param expected_per_page: ожидаемое количество записей на страницу
+    :return: множество неполных страниц
+    """
+
+    if not page_sizes:
+        return set()
+
+    max_page = max(page_sizes.keys())
+    return {p for p, cnt in page_sizes.items() if p < max_page and cnt < expected_per_page}
 
 
 def cleanup_incomplete_pages(rows: List[Dict[str, Any]], expected_per_page: int = 20) -> List[Dict[str, Any]]:
     """
     Удаляет записи страниц (< max_page), если на странице меньше expected_per_page записей.
     Самая большая page не проверяется (может быть неполной).
+    Записи без корректной page отбрасываются.
 
     :param rows: список записей CSV
     :param expected_per_page: ожидаемое количество записей на страницу
-    :return: очищенный список записей
+    :return: очищенный список записей (новый список; сам rows возвращается, только если ни у одной записи нет корректной page)
     """
 
-    if not rows:
-        return rows
-
-    # группировка по page
-    pages = defaultdict(list)
+    # счётчик по страницам вместо группировки самих записей; правило — общее с find_incomplete_pages
+    counts = Counter()
+    parsed = []
     for row in rows:
-        page = row.get("page")
-        if page is not None:
-            try:
-                page = int(page)
-                pages[page].append(row)
-            except ValueError:
-                continue
-
-    if not pages:
-        return rows
-
-    max_page = max(pages.keys())
-
-    cleaned_rows = []
-
-    for page_num, page_rows in pages.items():
-        # если страница меньше max_page и неполная — пропускаем её
-        if page_num < max_page and len(page_rows) < expected_per_page:
+        try:
+            p = int(row["page"])
+        except (KeyError, TypeError, ValueError):
             continue
+        counts[p] += 1
+        parsed.append((p, row))
+    if not counts:
+        return rows
 
-        cleaned_rows.extend(page_rows)
-
-    return cleaned_rows
+    incomplete = find_incomplete_pages(counts, expected_per_page)
+    return [row for p, row in parsed if p not in incomplete]